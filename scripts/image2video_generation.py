@@ -8,24 +8,30 @@
 
 import json
 import os
+import subprocess
 import requests
 import tempfile
+import numpy as np
 from moviepy import *
+from moviepy.config import FFMPEG_BINARY
 import urllib.parse
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import time
 import sys
 import argparse
 
 class Image2VideoGenerator:
-    def __init__(self, output_dir: str = "output/video"):
+    def __init__(self, output_dir: str = "output/video", backend: str = "moviepy"):
         self.output_dir = output_dir
+        self.backend = backend
         self.temp_dir = tempfile.mkdtemp()
         os.makedirs(output_dir, exist_ok=True)
         
         # 视频参数
         self.video_size = (1050, 1200)
         self.fps = 24
+        self.audio_fps = 44100
+        self.audio_channels = 2
         
     def download_file(self, url: str, filename: str) -> Optional[str]:
         """下载文件"""
@@ -44,6 +50,16 @@ class Image2VideoGenerator:
             print(f"❌ 下载失败 {filename}: {e}")
             return None
     
+    def decode_audio(self, audio_path: str) -> np.ndarray:
+        """使用ffmpeg将音频一次性解码为 (采样数, 声道数) 的float32数组"""
+        command = [
+            FFMPEG_BINARY, '-v', 'error', '-i', audio_path,
+            '-f', 'f32le', '-acodec', 'pcm_f32le',
+            '-ac', str(self.audio_channels), '-ar', str(self.audio_fps), '-'
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, self.audio_channels)
+    
     def create_image_clip(self, image_path: str, start_time: float, duration: float):
         """创建图片片段"""
         try:
@@ -97,10 +113,8 @@ class Image2VideoGenerator:
             total_duration = sum(duration_info.get('duration', 0) for duration_info in voice_durations[:min_count])
             print(f"   ⏱️  总时长: {total_duration:.1f} 秒 ({total_duration / 60:.1f} 分钟)")
             
-            # 创建视频片段列表
-            video_clips = []
-            audio_clips = []
-            
+            # 下载每个镜头的图片和音频
+            shots = []
             current_time = 0.0
             
             # 按顺序处理每个镜头
@@ -119,96 +133,32 @@ class Image2VideoGenerator:
                 print(f"   🎵 音频时长: {clip_duration:.1f}s")
                 print(f"   ⏰ 开始时间: {current_time:.1f}s")
                 
-                # 1. 下载并处理图片
+                # 1. 下载图片
                 image_filename = f"image_{i+1}.jpg"
                 image_path = self.download_file(image_url, image_filename)
                 
-                if image_path:
-                    # 创建图片片段
-                    img_clip = self.create_image_clip(
-                        image_path, current_time, clip_duration
-                    )
-                    
-                    if img_clip:
-                        video_clips.append(img_clip)
-                        print(f"   ✅ 图片片段创建成功")
-                    else:
-                        print(f"   ❌ 图片片段创建失败")
-                
-                # 2. 下载并处理音频
+                # 2. 下载音频
+                audio_path = None
                 voice_url = self.extract_voice_url(voice_data)
                 if voice_url:
                     audio_filename = f"voice_{i+1}.mp3"
                     audio_path = self.download_file(voice_url, audio_filename)
-                    
-                    if audio_path:
-                        try:
-                            audio_clip = AudioFileClip(audio_path)
-                            # 设置音频开始时间
-                            audio_clip = audio_clip.with_start(current_time)
-                            # 确保音频时长不超过预期
-                            if audio_clip.duration > clip_duration:
-                                audio_clip = audio_clip.subclipped(0, clip_duration)
-                            audio_clips.append(audio_clip)
-                            print(f"   ✅ 音频片段创建成功")
-                        except Exception as e:
-                            print(f"   ❌ 音频处理失败: {e}")
                 else:
                     print(f"   ❌ 无法提取音频URL")
                 
+                shots.append((image_path, audio_path, current_time, clip_duration))
+                
                 # 更新时间
                 current_time += clip_duration
             
-            # 合成视频
-            print(f"\n🎬 开始合成视频...")
-            print(f"   📹 视频片段数: {len(video_clips)}")
-            print(f"   🎵 音频片段数: {len(audio_clips)}")
+            output_path = os.path.join(self.output_dir, output_filename)
             
-            if video_clips:
-                # 合并所有视频片段
-                final_video = CompositeVideoClip(video_clips, size=self.video_size)
-                final_video = final_video.with_duration(total_duration)
-                
-                # 合并音频
-                if audio_clips:
-                    final_audio = CompositeAudioClip(audio_clips)
-                    final_audio = final_audio.with_duration(total_duration)
-                    final_video = final_video.with_audio(final_audio)
-                    print("   ✅ 音频合成完成")
-                else:
-                    print("   ⚠️  没有音频，生成静音视频")
-                
-                # 输出视频
-                output_path = os.path.join(self.output_dir, output_filename)
-                
-                print(f"💾 正在保存视频: {output_path}")
-                
-                final_video.write_videofile(
-                    output_path,
-                    fps=self.fps,
-                    codec='libx264',
-                    audio_codec='aac',
-                    temp_audiofile='temp-audio.m4a',
-                    remove_temp=True
-                )
-                
-                print(f"✅ 视频生成完成: {output_path}")
-                
-                # 显示文件信息
-                if os.path.exists(output_path):
-                    file_size = os.path.getsize(output_path)
-                    print(f"📦 文件大小: {file_size / 1024 / 1024:.1f} MB")
-                
-                # 清理资源
-                final_video.close()
-                for clip in video_clips + audio_clips:
-                    if hasattr(clip, 'close'):
-                        clip.close()
-                
-                return output_path
-            else:
-                print("❌ 没有有效的视频片段")
-                return None
+            if self.backend == "ffmpeg":
+                if all(image_path for image_path, _, _, _ in shots):
+                    return self.render_with_ffmpeg(shots, total_duration, output_path)
+                print("⚠️  存在下载失败的图片，回退到MoviePy渲染")
+            
+            return self.render_with_moviepy(shots, total_duration, output_path)
                 
         except Exception as e:
             print(f"❌ 生成视频时出错: {e}")
@@ -216,6 +166,143 @@ class Image2VideoGenerator:
             traceback.print_exc()
             return None
     
+    def render_with_moviepy(self, shots: List[Tuple[Optional[str], Optional[str], float, float]],
+                            total_duration: float, output_path: str) -> Optional[str]:
+        """使用MoviePy逐镜头合成视频"""
+        # 创建视频片段列表
+        video_clips = []
+        audio_clips = []
+        
+        for image_path, audio_path, start_time, clip_duration in shots:
+            if image_path:
+                # 创建图片片段
+                img_clip = self.create_image_clip(
+                    image_path, start_time, clip_duration
+                )
+                
+                if img_clip:
+                    video_clips.append(img_clip)
+                    print(f"   ✅ 图片片段创建成功")
+                else:
+                    print(f"   ❌ 图片片段创建失败")
+            
+            if audio_path:
+                try:
+                    # 一次性解码到内存，确保音频时长不超过预期
+                    samples = self.decode_audio(audio_path)
+                    samples = samples[:int(round(clip_duration * self.audio_fps))]
+                    audio_clip = AudioArrayClip(samples, fps=self.audio_fps)
+                    # 设置音频开始时间
+                    audio_clip = audio_clip.with_start(start_time)
+                    audio_clips.append(audio_clip)
+                    print(f"   ✅ 音频片段创建成功")
+                except Exception as e:
+                    print(f"   ❌ 音频处理失败: {e}")
+        
+        # 合成视频
+        print(f"\n🎬 开始合成视频...")
+        print(f"   📹 视频片段数: {len(video_clips)}")
+        print(f"   🎵 音频片段数: {len(audio_clips)}")
+        
+        if not video_clips:
+            print("❌ 没有有效的视频片段")
+            return None
+        
+        # 合并所有视频片段
+        final_video = CompositeVideoClip(video_clips, size=self.video_size)
+        final_video = final_video.with_duration(total_duration)
+        
+        # 合并音频
+        if audio_clips:
+            final_audio = CompositeAudioClip(audio_clips)
+            final_audio = final_audio.with_duration(total_duration)
+            final_video = final_video.with_audio(final_audio)
+            print("   ✅ 音频合成完成")
+        else:
+            print("   ⚠️  没有音频，生成静音视频")
+        
+        # 输出视频
+        print(f"💾 正在保存视频: {output_path}")
+        
+        final_video.write_videofile(
+            output_path,
+            fps=self.fps,
+            codec='libx264',
+            audio_codec='aac',
+            temp_audiofile='temp-audio.m4a',
+            remove_temp=True
+        )
+        
+        print(f"✅ 视频生成完成: {output_path}")
+        
+        # 显示文件信息
+        if os.path.exists(output_path):
+            file_size = os.path.getsize(output_path)
+            print(f"📦 文件大小: {file_size / 1024 / 1024:.1f} MB")
+        
+        # 清理资源
+        final_video.close()
+        for clip in video_clips + audio_clips:
+            if hasattr(clip, 'close'):
+                clip.close()
+        
+        return output_path
+    
+    def render_with_ffmpeg(self, shots: List[Tuple[str, Optional[str], float, float]],
+                           total_duration: float, output_path: str) -> Optional[str]:
+        """跳过MoviePy，直接用ffmpeg的concat分离器拼接图片并混合音频"""
+        print(f"\n🎬 开始使用ffmpeg合成视频...")
+        print(f"   📹 镜头数: {len(shots)}")
+        
+        # 图片列表：每张图片显示对应的音频时长；concat分离器要求最后一个文件再列一次
+        concat_path = os.path.join(self.temp_dir, "concat.txt")
+        with open(concat_path, 'w', encoding='utf-8') as concat_file:
+            for image_path, _, _, clip_duration in shots:
+                concat_file.write(f"file '{image_path}'\nduration {clip_duration}\n")
+            concat_file.write(f"file '{shots[-1][0]}'\n")
+        
+        width, height = self.video_size
+        command = [FFMPEG_BINARY, '-v', 'error', '-y', '-f', 'concat', '-safe', '0', '-i', concat_path]
+        filters = [f"[0:v]scale={width}:{height},setsar=1,fps={self.fps},format=yuv420p[vout]"]
+        audio_labels = []
+        
+        # 音频：每个镜头截断/补齐到镜头时长后顺序拼接，缺失的音频用静音代替
+        for i, (_, audio_path, _, clip_duration) in enumerate(shots, start=1):
+            if audio_path:
+                command += ['-i', audio_path]
+            else:
+                command += ['-f', 'lavfi', '-t', str(clip_duration),
+                            '-i', f'anullsrc=r={self.audio_fps}:cl=stereo']
+            filters.append(
+                f"[{i}:a]aformat=sample_rates={self.audio_fps}:channel_layouts=stereo,"
+                f"atrim=0:{clip_duration},apad=whole_dur={clip_duration}[a{i}]"
+            )
+            audio_labels.append(f"[a{i}]")
+        filters.append(f"{''.join(audio_labels)}concat=n={len(audio_labels)}:v=0:a=1[aout]")
+        
+        command += [
+            '-filter_complex', ';'.join(filters),
+            '-map', '[vout]', '-map', '[aout]',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-threads', '0',
+            '-c:a', 'aac', '-t', str(total_duration),
+            output_path
+        ]
+        
+        print(f"💾 正在保存视频: {output_path}")
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            print(f"❌ ffmpeg合成失败: {result.stderr.strip()}")
+            return None
+        
+        print(f"✅ 视频生成完成: {output_path}")
+        
+        # 显示文件信息
+        if os.path.exists(output_path):
+            file_size = os.path.getsize(output_path)
+            print(f"📦 文件大小: {file_size / 1024 / 1024:.1f} MB")
+        
+        return output_path
+    
     def cleanup(self):
         """清理临时文件"""
         import shutil
@@ -247,6 +334,8 @@ def main():
                        help='JSON配置文件路径 (默认: xiajiqushi.json)')
     parser.add_argument('-o', '--output', default=None,
                        help='输出目录 (默认: output/video)')
+    parser.add_argument('--backend', choices=['moviepy', 'ffmpeg'], default='moviepy',
+                       help='渲染后端 (默认: moviepy)')
     
     args = parser.parse_args()
     
@@ -286,7 +375,7 @@ def main():
         return
     
     # 创建视频生成器
-    generator = Image2VideoGenerator(output_dir)
+    generator = Image2VideoGenerator(output_dir, args.backend)
     
     try:
         # 生成输出文件名
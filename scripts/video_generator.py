@@ -8,20 +8,70 @@
 
 import json
 import os
+import queue
+import subprocess
+import threading
 import requests
 import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
 from moviepy import *
+from moviepy.config import FFMPEG_BINARY
 import urllib.parse
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import time
 import sys
 import argparse
 
+# orjson 的解析器由C实现，未安装时回退到标准库
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# 以JSON字符串形式嵌套在配置中的字段
+NESTED_JSON_FIELDS = ('audioData', 'imageData', 'bgAudioData', 'kcAudioData')
+
+class FrameBufferPool:
+    """预分配的帧缓冲池
+    
+    循环复用固定数量的 H×W×3 uint8 缓冲区，避免逐帧分配新的ndarray。
+    写出视频时每一帧都会在请求下一帧之前被合成/送入ffmpeg，
+    因此只要池中缓冲区数量大于同时在用的帧数即可安全复用。
+    """
+    
+    def __init__(self, size: tuple, count: int = 4):
+        width, height = size
+        self._buffers = deque(np.empty((height, width, 3), dtype=np.uint8) for _ in range(count))
+    
+    def acquire(self) -> np.ndarray:
+        """取出下一个缓冲区（轮转复用）"""
+        buffer = self._buffers[0]
+        self._buffers.rotate(-1)
+        return buffer
+
+
 class VideoGeneratorFixed:
     def __init__(self, output_dir: str = "output/video"):
         self.output_dir = output_dir
         self.temp_dir = tempfile.mkdtemp()
         os.makedirs(output_dir, exist_ok=True)
+        
+        # 视频参数
+        self.video_size = (1440, 1080)
+        self.fps = 24
+        
+        # 所有缩放镜头共用一个帧缓冲池：合成时每个片段的帧都会立即复制到画布上，
+        # 因此无需为每个镜头各自分配缓冲区
+        self.frame_pool = FrameBufferPool(self.video_size)
+        
+        # 音频混合参数
+        self.audio_fps = 44100
+        self.audio_channels = 2
+        self.audio_cache: Dict[str, np.ndarray] = {}
     
     def download_file(self, url: str, filename: str) -> Optional[str]:
         """下载文件"""
@@ -40,9 +90,68 @@ class VideoGeneratorFixed:
             print(f"下载失败 {filename}: {e}")
             return None
     
-    def microseconds_to_seconds(self, microseconds: int) -> float:
-        """将微秒转换为秒"""
-        return microseconds / 1000000.0
+    def timeline_to_seconds(self, items: List[Dict[str, Any]], key: str) -> np.ndarray:
+        """将时间轴条目中的微秒字段批量转换为秒"""
+        return np.fromiter((item[key] for item in items), dtype=np.int64, count=len(items)) / 1000000.0
+    
+    def decode_audio(self, audio_path: str) -> np.ndarray:
+        """使用ffmpeg将音频一次性解码为 (采样数, 声道数) 的float32数组"""
+        command = [
+            FFMPEG_BINARY, '-v', 'error', '-i', audio_path,
+            '-f', 'f32le', '-acodec', 'pcm_f32le',
+            '-ac', str(self.audio_channels), '-ar', str(self.audio_fps), '-'
+        ]
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, self.audio_channels)
+    
+    def decode_cached_audio(self, url: str, audio_path: str) -> Optional[np.ndarray]:
+        """解码已下载的音频，按URL缓存解码结果，同一音频只解码一次"""
+        if url in self.audio_cache:
+            return self.audio_cache[url]
+        
+        try:
+            samples = self.decode_audio(audio_path)
+        except Exception as e:
+            print(f"音频解码失败 {audio_path}: {e}")
+            return None
+        
+        self.audio_cache[url] = samples
+        return samples
+    
+    def load_audio(self, url: str, filename: str) -> Optional[np.ndarray]:
+        """下载并解码音频，已缓存的URL不再重复下载"""
+        if url in self.audio_cache:
+            return self.audio_cache[url]
+        
+        audio_path = self.download_file(url, filename)
+        if not audio_path:
+            return None
+        
+        return self.decode_cached_audio(url, audio_path)
+    
+    def mix_audio_tracks(self, tracks: List[Tuple[np.ndarray, float, float]],
+                         total_duration: float) -> np.ndarray:
+        """在NumPy中预先混合所有音轨
+        
+        Args:
+            tracks: (解码后的采样数组, 开始时间, 音量系数) 列表
+            total_duration: 视频总时长（秒）
+            
+        Returns:
+            np.ndarray: 混合后的 (采样数, 声道数) float32 数组
+        """
+        total_samples = int(round(total_duration * self.audio_fps))
+        mix = np.zeros((total_samples, self.audio_channels), dtype=np.float32)
+        
+        for samples, start_time, volume in tracks:
+            # 按开始时间放入混音缓冲区，超出总时长的部分直接截断
+            offset = int(round(start_time * self.audio_fps))
+            count = min(len(samples), total_samples - offset)
+            if count > 0:
+                mix[offset:offset + count] += samples[:count] * volume
+        
+        np.clip(mix, -1.0, 1.0, out=mix)
+        return mix
     
     def create_subtitle_clip(self, text: str, start_time: float, end_time: float, 
                            video_size: tuple = (1440, 1080)):
@@ -83,106 +192,170 @@ class VideoGeneratorFixed:
         
         # 创建图片片段
         img_clip = ImageClip(image_path)
+        
+        # 添加动画效果
+        if animation_type == "轻微放大":
+            # 缩放动画：把适配视频尺寸的缩放和动画缩放合并为一次以画面中心为基准的仿射变换，
+            # 每帧只对原图重采样一次，并直接写入缓冲池中的复用缓冲区
+            source = img_clip.get_frame(0)
+            width, height = video_size
+            scale_x = width / source.shape[1]
+            scale_y = height / source.shape[0]
+            pool = self.frame_pool if video_size == self.video_size else FrameBufferPool(video_size)
+            
+            def make_frame(t):
+                zoom = 1.0 + (t / duration) * 0.05
+                matrix = np.float32([
+                    [scale_x * zoom, 0, width * (1.0 - zoom) / 2],
+                    [0, scale_y * zoom, height * (1.0 - zoom) / 2],
+                ])
+                return cv2.warpAffine(source, matrix, video_size, dst=pool.acquire(),
+                                      flags=cv2.INTER_LINEAR)
+            
+            img_clip.close()
+            img_clip = VideoClip(frame_function=make_frame, duration=duration)
+            return img_clip.with_start(start_time)
+        
         img_clip = img_clip.with_duration(duration).with_start(start_time)
         
         # 调整大小以适应视频尺寸
         img_clip = img_clip.resized(video_size)
         
-        # 添加动画效果
-        if animation_type == "轻微放大":
-            # 使用resize创建缩放动画
-            img_clip = img_clip.resized(lambda t: 1.0 + (t / duration) * 0.05)
-        
         return img_clip
     
+    def download_shots(self, audio_data: List[Dict[str, Any]], image_data: List[Dict[str, Any]],
+                       shot_queue: queue.Queue, stop_event: threading.Event):
+        """生产者：按顺序下载每个镜头的音频和图片，将 (序号, 图片路径, 音频路径) 放入队列
+        
+        下载过程中出现异常时把异常对象放入队列，由消费者重新抛出，避免被当作正常结束。
+        """
+        try:
+            for i in range(max(len(audio_data), len(image_data))):
+                if stop_event.is_set():
+                    break
+                
+                audio_path = None
+                if i < len(audio_data):
+                    audio_path = self.download_file(audio_data[i]['audio_url'], f"audio_{i}.mp3")
+                
+                image_path = None
+                if i < len(image_data):
+                    image_path = self.download_file(image_data[i]['image_url'], f"image_{i}.jpg")
+                
+                shot_queue.put((i, image_path, audio_path))
+        except Exception as e:
+            shot_queue.put(e)
+        finally:
+            shot_queue.put(None)
+    
     def generate_video(self, video_data: Dict[str, Any], output_filename: str = "generated_video.mp4"):
         """生成视频"""
         try:
             # 解析JSON数据
-            audio_data = json.loads(video_data['audioData'])
-            image_data = json.loads(video_data['imageData'])
+            video_data = parse_nested_fields(video_data)
+            audio_data = video_data['audioData']
+            image_data = video_data['imageData']
             text_timelines = video_data['text_timielines']
             text_captions = video_data['text_captions']
-            bg_audio_data = json.loads(video_data['bgAudioData'])
-            kc_audio_data = json.loads(video_data['kcAudioData'])
+            bg_audio_data = video_data['bgAudioData']
+            kc_audio_data = video_data['kcAudioData']
+            
+            # 一次性将各时间轴的微秒时间转换为秒
+            audio_starts = self.timeline_to_seconds(audio_data, 'start')
+            audio_ends = self.timeline_to_seconds(audio_data, 'end')
+            image_starts = self.timeline_to_seconds(image_data, 'start')
+            image_ends = self.timeline_to_seconds(image_data, 'end')
+            text_starts = self.timeline_to_seconds(text_timelines, 'start')
+            text_ends = self.timeline_to_seconds(text_timelines, 'end')
             
             # 计算正确的总时长 - 从最后一个音频片段的结束时间获取
-            last_audio = audio_data[-1] if audio_data else None
-            total_duration = self.microseconds_to_seconds(last_audio['end']) if last_audio else 60.0
+            total_duration = float(audio_ends[-1]) if audio_data else 60.0
             
             print("开始生成视频...")
             print(f"预期总时长: {total_duration:.2f}秒")
             
-            # 下载音频文件
-            audio_clips = []
-            for i, audio_info in enumerate(audio_data):
-                audio_url = audio_info['audio_url']
-                start_time = self.microseconds_to_seconds(audio_info['start'])
-                
-                # 下载音频文件
-                audio_filename = f"audio_{i}.mp3"
-                audio_path = self.download_file(audio_url, audio_filename)
-                
-                if audio_path:
-                    audio_clip = AudioFileClip(audio_path)
-                    audio_clip = audio_clip.with_start(start_time)
-                    audio_clips.append(audio_clip)
-            
-            # 下载图片文件并创建视频片段
+            # 下载与合成流水线：后台线程按顺序下载各镜头的音频和图片，
+            # 主线程同时解码已下载的音频并创建图片片段（解码、缩放图片）
+            audio_tracks = []
             video_clips = []
-            for i, img_info in enumerate(image_data):
-                img_url = img_info['image_url']
-                start_time = self.microseconds_to_seconds(img_info['start'])
-                end_time = self.microseconds_to_seconds(img_info['end'])
-                animation_type = img_info.get('in_animation')
-                
-                # 下载图片文件
-                img_filename = f"image_{i}.jpg"
-                img_path = self.download_file(img_url, img_filename)
-                
-                if img_path:
+            
+            shot_queue = queue.Queue(maxsize=4)
+            stop_event = threading.Event()
+            producer = threading.Thread(
+                target=self.download_shots,
+                args=(audio_data, image_data, shot_queue, stop_event),
+                daemon=True
+            )
+            producer.start()
+            
+            try:
+                while True:
+                    item = shot_queue.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    i, img_path, audio_path = item
+                    
+                    # 解码音频，收集 (采样, 开始时间, 音量) 供统一混音
+                    if audio_path:
+                        samples = self.decode_cached_audio(audio_data[i]['audio_url'], audio_path)
+                        if samples is not None:
+                            audio_tracks.append((samples, audio_starts[i], 1.0))
+                    
+                    if not img_path:
+                        continue
+                    
+                    # 静态镜头的 ImageClip 只在创建时缩放一次，合成时直接复用同一帧
                     img_clip = self.create_image_clip_with_animation(
-                        img_path, start_time, end_time, animation_type
+                        img_path, image_starts[i], image_ends[i],
+                        image_data[i].get('in_animation'), self.video_size
                     )
                     video_clips.append(img_clip)
+            finally:
+                # 提前退出时通知下载线程停止，并清空队列以免其阻塞在put上
+                stop_event.set()
+                while producer.is_alive():
+                    try:
+                        shot_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
             
             # 创建字幕片段
-            subtitle_clips = []
+            subtitle_jobs = []
             print(f"创建 {len(text_captions)} 个字幕片段...")
-            for i, (timeline, caption) in enumerate(zip(text_timelines, text_captions)):
-                start_time = self.microseconds_to_seconds(timeline['start'])
-                end_time = self.microseconds_to_seconds(timeline['end'])
-                
+            for start_time, end_time, caption in zip(text_starts, text_ends, text_captions):
                 if start_time < total_duration:  # 只创建在总时长内的字幕
                     end_time = min(end_time, total_duration)  # 确保不超过总时长
-                    subtitle_clip = self.create_subtitle_clip(caption, start_time, end_time)
-                    subtitle_clips.append(subtitle_clip)
+                    subtitle_jobs.append((caption, start_time, end_time))
+            
+            # 各字幕的文字栅格化相互独立，用线程池并行创建；map 保持原有顺序
+            subtitle_clips = []
+            if subtitle_jobs:
+                max_workers = min(8, os.cpu_count() or 1, len(subtitle_jobs))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    subtitle_clips = list(executor.map(
+                        lambda job: self.create_subtitle_clip(*job), subtitle_jobs
+                    ))
             
             # 下载背景音乐
-            bg_audio_clips = []
             for bg_audio_info in bg_audio_data:
                 bg_url = bg_audio_info['audio_url']
                 bg_filename = "bg_music.mp3"
-                bg_path = self.download_file(bg_url, bg_filename)
+                bg_samples = self.load_audio(bg_url, bg_filename)
                 
-                if bg_path:
-                    bg_clip = AudioFileClip(bg_path)
-                    bg_clip = bg_clip.with_volume_scaled(0.3)  # 降低背景音乐音量
-                    # 确保背景音乐不超过总时长
-                    bg_clip = bg_clip.with_duration(total_duration)
-                    bg_audio_clips.append(bg_clip)
+                if bg_samples is not None:
+                    # 降低背景音乐音量，超出总时长的部分在混音时截断
+                    audio_tracks.append((bg_samples, 0.0, 0.3))
             
             # 下载开场音效
-            kc_audio_clips = []
             for kc_audio_info in kc_audio_data:
                 kc_url = kc_audio_info['audio_url']
                 kc_filename = "opening_sound.mp3"
-                kc_path = self.download_file(kc_url, kc_filename)
+                kc_samples = self.load_audio(kc_url, kc_filename)
                 
-                if kc_path:
-                    kc_clip = AudioFileClip(kc_path)
-                    kc_clip = kc_clip.with_volume_scaled(0.5)  # 适中音量
-                    kc_audio_clips.append(kc_clip)
+                if kc_samples is not None:
+                    audio_tracks.append((kc_samples, 0.0, 0.5))  # 适中音量
             
             print("开始合成视频...")
             
@@ -190,24 +363,23 @@ class VideoGeneratorFixed:
             if video_clips:
                 # 合并所有视频片段和字幕
                 all_clips = video_clips + subtitle_clips
-                final_video = CompositeVideoClip(all_clips, size=(1440, 1080))
+                final_video = CompositeVideoClip(all_clips, size=self.video_size)
                 
                 # 强制设置正确的时长
                 final_video = final_video.subclipped(0, total_duration)
                 
-                # 合并音频
-                all_audio_clips = audio_clips + bg_audio_clips + kc_audio_clips
-                if all_audio_clips:
-                    final_audio = CompositeAudioClip(all_audio_clips)
-                    # 确保音频时长不超过视频时长
-                    final_audio = final_audio.subclipped(0, total_duration)
+                # 合并音频 - 预先在内存中混合，避免CompositeAudioClip逐块回调
+                final_audio = None
+                if audio_tracks:
+                    mix = self.mix_audio_tracks(audio_tracks, total_duration)
+                    final_audio = AudioArrayClip(mix, fps=self.audio_fps)
                     final_video = final_video.with_audio(final_audio)
                 
                 # 输出视频
                 output_path = os.path.join(self.output_dir, output_filename)
                 final_video.write_videofile(
                     output_path,
-                    fps=24,
+                    fps=self.fps,
                     codec='libx264',
                     audio_codec='aac',
                     temp_audiofile='temp-audio.m4a',
@@ -218,7 +390,9 @@ class VideoGeneratorFixed:
                 
                 # 清理临时文件
                 final_video.close()
-                for clip in audio_clips + video_clips + subtitle_clips + bg_audio_clips + kc_audio_clips:
+                if final_audio is not None:
+                    final_audio.close()
+                for clip in video_clips + subtitle_clips:
                     clip.close()
                 
                 return output_path
@@ -241,35 +415,42 @@ class VideoGeneratorFixed:
         except:
             pass
 
+def parse_nested_fields(video_data: Dict[str, Any]) -> Dict[str, Any]:
+    """将以JSON字符串形式嵌套的字段解析为列表，已解析过的字段保持不变"""
+    for field in NESTED_JSON_FIELDS:
+        value = video_data.get(field)
+        if isinstance(value, (str, bytes)):
+            video_data[field] = json_loads(value)
+    return video_data
+
 def load_video_data_from_file(file_path: str) -> Optional[Dict[str, Any]]:
     """从文件加载视频数据"""
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # 处理转义字符
-        # 如果文件包含转义的换行符，先处理它们
-        if '\\n' in content:
-            content = content.replace('\\n', '\n')
+        stripped = content.strip()
         
-        # 如果文件包含转义的引号，处理它们
-        if '\\"' in content:
-            # 这是一个更复杂的情况，需要先解析外层JSON，再处理内层的转义字符串
+        if stripped.startswith('"'):
+            # 整个文件是一个JSON字符串（JSON被再次编码），解析两次即可
+            video_data = json_loads(json_loads(stripped))
+        else:
+            # 处理转义字符
+            # 如果文件包含转义的换行符，先处理它们
+            if '\\n' in content:
+                content = content.replace('\\n', '\n')
+            
             try:
-                # 尝试直接解析
-                video_data = json.loads(content)
+                video_data = json_loads(content)
             except json.JSONDecodeError:
-                # 如果失败，尝试使用ast.literal_eval处理一些转义字符
-                import ast
+                # 如果文件包含转义的引号，说明是去掉了外层引号的JSON字符串，
+                # 补上引号后先按JSON字符串解码一次，再解析其中的JSON
+                if '\\"' not in content:
+                    raise
                 try:
-                    # 先尝试将转义字符串转换为正常字符串
-                    content = ast.literal_eval(f'"{content}"')
-                    video_data = json.loads(content)
-                except:
+                    video_data = json_loads(json_loads(f'"{content.strip()}"'))
+                except json.JSONDecodeError:
                     raise ValueError("无法解析JSON格式")
-        else:
-            # 正常解析JSON
-            video_data = json.loads(content)
         
         # 确保必要的字段存在
         required_fields = ['audioData', 'imageData', 'text_timielines', 'text_captions', 'bgAudioData', 'kcAudioData']
@@ -288,7 +469,7 @@ def load_video_data_from_file(file_path: str) -> Optional[Dict[str, Any]]:
         if 'all_content' not in video_data:
             video_data['all_content'] = None
         
-        return video_data
+        return parse_nested_fields(video_data)
         
     except Exception as e:
         print(f"❌ 加载视频数据失败: {e}")
@@ -341,10 +522,10 @@ def main():
         print("❌ 加载视频数据失败")
         return
     
-    # 解析音频数据获取视频信息
+    # 获取视频信息（嵌套字段在加载时已解析）
     try:
-        audio_data = json.loads(video_data['audioData'])
-        image_data = json.loads(video_data['imageData'])
+        audio_data = video_data['audioData']
+        image_data = video_data['imageData']
         
         # 计算总时长
         total_duration_microseconds = audio_data[-1]['end'] if audio_data else 60000000
@@ -4,10 +4,39 @@ MoviePy Tools 安装测试脚本
 检查依赖是否正确安装，系统是否可以正常运行
 """
 
+import os
 import sys
+import json
+import shutil
 import subprocess
+import importlib
+import importlib.util
+from collections import defaultdict
 from pathlib import Path
 
+# FFmpeg版本检测结果缓存（以可执行文件的路径和修改时间为键）
+FFMPEG_CACHE_FILE = Path.home() / ".cache" / "moviepy-tools" / "ffmpeg.json"
+
+def _read_ffmpeg_cache(ffmpeg_path, mtime_ns):
+    """读取缓存的FFmpeg版本信息，可执行文件未变化时返回版本行"""
+    try:
+        with open(FFMPEG_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('path') == ffmpeg_path and cache.get('mtime_ns') == mtime_ns:
+            return cache.get('version')
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _write_ffmpeg_cache(ffmpeg_path, mtime_ns, version_line):
+    """写入FFmpeg版本缓存，写入失败不影响检测结果"""
+    try:
+        FFMPEG_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(FFMPEG_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'path': ffmpeg_path, 'mtime_ns': mtime_ns, 'version': version_line}, f)
+    except OSError:
+        pass
+
 def test_python_version():
     """测试Python版本"""
     print("🐍 检查Python版本...")
@@ -40,7 +69,9 @@ def test_dependencies():
     
     for package in required_packages:
         try:
-            __import__(package)
+            # 只定位模块而不执行其顶层代码，避免导入 moviepy/numpy 等的开销
+            if importlib.util.find_spec(package) is None:
+                raise ImportError(package)
             print(f"   ✅ {package}")
         except ImportError:
             print(f"   ❌ {package} (未安装)")
@@ -59,10 +90,24 @@ def test_ffmpeg():
     print("\n🎬 检查FFmpeg...")
     
     try:
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              capture_output=True, text=True, timeout=10)
+        # 先在PATH中查找，未找到时无需启动子进程
+        ffmpeg_path = shutil.which('ffmpeg')
+        if ffmpeg_path is None:
+            raise FileNotFoundError('ffmpeg')
+        
+        # 可执行文件未变化时直接使用缓存的版本信息
+        mtime_ns = os.stat(ffmpeg_path).st_mtime_ns
+        version_line = _read_ffmpeg_cache(ffmpeg_path, mtime_ns)
+        if version_line:
+            print(f"   ✅ {version_line}")
+            return True
+        
+        result = subprocess.run([ffmpeg_path, '-hide_banner', '-version'],
+                              stdin=subprocess.DEVNULL, capture_output=True,
+                              text=True, timeout=5)
         if result.returncode == 0:
             version_line = result.stdout.split('\n')[0]
+            _write_ffmpeg_cache(ffmpeg_path, mtime_ns, version_line)
             print(f"   ✅ {version_line}")
             return True
         else:
@@ -112,9 +157,28 @@ def test_project_structure():
     
     missing_items = []
     
+    # 按父目录分组，每个目录只读取一次，再在名称集合中检查
+    names_by_parent = defaultdict(set)
+    for item in required_dirs + required_files:
+        parent, _, name = item.rpartition('/')
+        names_by_parent[parent or '.'].add(name)
+    
+    present_names = {}
+    for parent in names_by_parent:
+        try:
+            with os.scandir(parent) as entries:
+                present_names[parent] = {entry.name for entry in entries}
+        except OSError:
+            # 父目录不存在时其下所有项目都视为缺失
+            present_names[parent] = set()
+    
+    def exists(item):
+        parent, _, name = item.rpartition('/')
+        return name in present_names[parent or '.']
+    
     # 检查目录
     for directory in required_dirs:
-        if Path(directory).exists():
+        if exists(directory):
             print(f"   ✅ {directory}/")
         else:
             print(f"   ❌ {directory}/ (缺失)")
@@ -122,7 +186,7 @@ def test_project_structure():
     
     # 检查文件
     for file_path in required_files:
-        if Path(file_path).exists():
+        if exists(file_path):
             print(f"   ✅ {file_path}")
         else:
             print(f"   ❌ {file_path} (缺失)")
@@ -140,21 +204,24 @@ def test_imports():
     print("\n🔧 测试模块导入...")
     
     test_modules = [
-        ('config', 'PROJECT_ROOT, VIDEO_CONFIG'),
-        ('core.video_processor', 'VideoProcessor'),
-        ('core.audio_processor', 'AudioProcessor'), 
-        ('core.subtitle_processor', 'SubtitleProcessor'),
-        ('core.batch_processor', 'BatchProcessor'),
-        ('utils.file_utils', 'ensure_output_dir'),
-        ('utils.time_utils', 'parse_time_string'),
-        ('utils.format_utils', 'get_video_info')
+        ('config', ('PROJECT_ROOT', 'VIDEO_CONFIG')),
+        ('core.video_processor', ('VideoProcessor',)),
+        ('core.audio_processor', ('AudioProcessor',)),
+        ('core.subtitle_processor', ('SubtitleProcessor',)),
+        ('core.batch_processor', ('BatchProcessor',)),
+        ('utils.file_utils', ('ensure_output_dir',)),
+        ('utils.time_utils', ('parse_time_string',)),
+        ('utils.format_utils', ('get_video_info',))
     ]
     
     import_errors = []
     
-    for module_name, items in test_modules:
+    for module_name, names in test_modules:
         try:
-            exec(f"from {module_name} import {items}")
+            module = importlib.import_module(module_name)
+            missing = [name for name in names if not hasattr(module, name)]
+            if missing:
+                raise ImportError(f"cannot import name {', '.join(missing)}")
             print(f"   ✅ {module_name}")
         except Exception as e:
             print(f"   ❌ {module_name} - {str(e)}")
@@ -2,6 +2,8 @@
 MoviePy Tools 工具函数模块
 """
 
+import importlib
+
 from .file_utils import (
     ensure_output_dir,
     get_unique_filename,
@@ -12,19 +14,34 @@ from .file_utils import (
 
 from .time_utils import (
     parse_time_string,
+    parse_time_string_nostrip,
     seconds_to_time_string,
     seconds_to_srt_time,
     srt_time_to_seconds,
+    srt_times_to_seconds_batch,
+    parse_srt_timestamps_from_bytes,
     format_duration
 )
 
-from .format_utils import (
-    get_video_info,
-    get_audio_info,
-    is_valid_video_format,
-    is_valid_audio_format,
-    convert_size_to_readable
-)
+# format_utils 中的函数按需导入（PEP 562），避免 import utils 时加载媒体相关依赖
+_LAZY_EXPORTS = {
+    "get_video_info": "format_utils",
+    "get_video_info_batch": "format_utils",
+    "get_audio_info": "format_utils",
+    "is_valid_video_format": "format_utils",
+    "is_valid_audio_format": "format_utils",
+    "convert_size_to_readable": "format_utils",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
 
 __all__ = [
     # file_utils
@@ -36,13 +53,17 @@ __all__ = [
     
     # time_utils
     "parse_time_string",
+    "parse_time_string_nostrip",
     "seconds_to_time_string",
     "seconds_to_srt_time",
     "srt_time_to_seconds",
+    "srt_times_to_seconds_batch",
+    "parse_srt_timestamps_from_bytes",
     "format_duration",
     
     # format_utils
     "get_video_info",
+    "get_video_info_batch",
     "get_audio_info",
     "is_valid_video_format",
     "is_valid_audio_format",
@@ -3,6 +3,7 @@
 """
 
 import os
+import stat
 import shutil
 from pathlib import Path
 from typing import List, Union, Optional
@@ -10,6 +11,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# 文件名非法字符替换表（统一替换为下划线）
+_ILLEGAL_FILENAME_TABLE = str.maketrans({char: '_' for char in '<>:"/\\|?*'})
+
 
 def ensure_output_dir(file_path: Union[str, Path]) -> None:
     """确保输出文件的目录存在
@@ -41,14 +45,48 @@ def get_unique_filename(file_path: Union[str, Path]) -> Path:
     suffix = path.suffix
     parent = path.parent
     
-    # 寻找可用的文件名
-    counter = 1
-    while True:
-        new_name = f"{stem}_{counter}{suffix}"
-        new_path = parent / new_name
-        if not new_path.exists():
-            return new_path
-        counter += 1
+    def candidate(counter: int) -> Path:
+        return parent / f"{stem}_{counter}{suffix}"
+    
+    # 指数探测：找到一个可用的上界，lo 始终为已占用的序号（0 表示原文件名）
+    lo, hi = 0, 1
+    while candidate(hi).exists():
+        lo, hi = hi, hi * 2
+    
+    # 二分查找 (lo, hi] 区间内第一个可用的序号；
+    # 序号连续占用时结果与逐个探测相同，存在空缺时返回的也一定是可用文件名
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if candidate(mid).exists():
+            lo = mid
+        else:
+            hi = mid
+    
+    return candidate(hi)
+
+
+def _scan_files_by_extension(directory: str, ext_set: frozenset,
+                             recursive: bool, files: List[Path]) -> None:
+    """用 os.scandir 扫描目录，收集扩展名匹配的文件
+    
+    DirEntry 的类型判断直接使用读目录时返回的信息，不需要额外的 stat 调用；
+    只有匹配的文件才会构造 Path 对象。
+    """
+    try:
+        entries = os.scandir(directory)
+    except OSError as e:
+        logger.debug(f"无法读取目录: {directory}, 错误: {e}")
+        return
+    
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    _scan_files_by_extension(entry.path, ext_set, recursive, files)
+            elif entry.is_file():
+                stem, dot, ext = entry.name.rpartition('.')
+                if dot and stem and ext.lower() in ext_set:
+                    files.append(Path(entry.path))
 
 
 def get_files_by_extension(directory: Union[str, Path], 
@@ -72,18 +110,10 @@ def get_files_by_extension(directory: Union[str, Path],
     
     files = []
     
-    # 标准化扩展名（确保以点开头且小写）
-    normalized_extensions = [ext.lower() if ext.startswith('.') else f'.{ext.lower()}' 
-                           for ext in extensions]
+    # 标准化扩展名（去掉开头的点并转为小写）
+    ext_set = frozenset(ext.lower().lstrip('.') for ext in extensions)
     
-    if recursive:
-        pattern = "**/*"
-    else:
-        pattern = "*"
-    
-    for file_path in directory.glob(pattern):
-        if file_path.is_file() and file_path.suffix.lower() in normalized_extensions:
-            files.append(file_path)
+    _scan_files_by_extension(str(directory), ext_set, recursive, files)
     
     # 按文件名排序
     files.sort(key=lambda x: x.name.lower())
@@ -102,25 +132,35 @@ def get_file_size(file_path: Union[str, Path]) -> int:
         int: 文件大小（字节）
     """
     try:
-        return Path(file_path).stat().st_size
+        return os.stat(file_path).st_size
     except (OSError, FileNotFoundError):
         logger.error(f"无法获取文件大小: {file_path}")
         return 0
 
 
 def copy_file_metadata(source_path: Union[str, Path], 
-                      target_path: Union[str, Path]) -> bool:
+                      target_path: Union[str, Path],
+                      full_metadata: bool = False) -> bool:
     """复制文件的元数据（时间戳等）
     
+    默认只复制访问/修改时间和权限位，不复制扩展属性（xattr）和ACL，
+    省去 shutil.copystat 在Linux上额外的xattr系统调用。
+    
     Args:
         source_path: 源文件路径
         target_path: 目标文件路径
+        full_metadata: 是否使用 shutil.copystat 复制全部元数据（含xattr、文件标志）
         
     Returns:
         bool: 是否成功
     """
     try:
-        shutil.copystat(str(source_path), str(target_path))
+        if full_metadata:
+            shutil.copystat(str(source_path), str(target_path))
+        else:
+            source_stat = os.stat(source_path)
+            os.utime(target_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+            os.chmod(target_path, stat.S_IMODE(source_stat.st_mode))
         logger.debug(f"元数据复制完成: {source_path} -> {target_path}")
         return True
     except Exception as e:
@@ -128,6 +168,72 @@ def copy_file_metadata(source_path: Union[str, Path],
         return False
 
 
+def _reserve_target(target: Path) -> bool:
+    """以 O_CREAT|O_EXCL 原子地创建空占位文件，抢占目标文件名
+    
+    检查与创建在同一次系统调用中完成，不存在 exists() 检查后被其他进程抢先写入的窗口。
+    
+    Args:
+        target: 目标文件路径
+        
+    Returns:
+        bool: 是否成功预留（目标已存在时返回False）
+    """
+    try:
+        fd = os.open(target, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    return True
+
+
+def _release_target(target: Path) -> None:
+    """操作失败时删除预留的占位文件"""
+    try:
+        if os.lstat(target).st_size == 0:
+            os.unlink(target)
+    except OSError:
+        pass
+
+
+def _move_no_clobber(source: Path, target: Path) -> bool:
+    """不覆盖已有文件地移动普通文件
+    
+    POSIX 上用 os.link + os.unlink（目标已存在时 link 失败），Windows 上 os.rename
+    本身拒绝覆盖已有文件，两者都在一次系统调用内完成检查与创建。跨设备或文件系统
+    不支持硬链接时，先预留目标文件名再由 shutil.move 复制。
+    
+    Args:
+        source: 源文件路径（普通文件）
+        target: 目标文件路径
+        
+    Returns:
+        bool: 是否移动成功（目标已存在时返回False）
+    """
+    try:
+        if os.name == 'nt':
+            os.rename(source, target)
+        else:
+            os.link(source, target)
+            try:
+                os.unlink(source)
+            except OSError:
+                os.unlink(target)
+                raise
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        if not _reserve_target(target):
+            return False
+        try:
+            shutil.move(str(source), str(target))
+        except Exception:
+            _release_target(target)
+            raise
+        return True
+
+
 def move_file(source_path: Union[str, Path], 
               target_path: Union[str, Path],
               overwrite: bool = False) -> bool:
@@ -141,23 +247,33 @@ def move_file(source_path: Union[str, Path],
     Returns:
         bool: 是否成功
     """
+    source = Path(source_path)
+    target = Path(target_path)
     try:
-        source = Path(source_path)
-        target = Path(target_path)
-        
-        if not source.exists():
+        # 直接lstat源路径，不存在时立即失败，无需单独的exists()检查
+        try:
+            source_stat = os.lstat(source)
+        except FileNotFoundError:
             logger.error(f"源文件不存在: {source}")
             return False
         
-        if target.exists() and not overwrite:
-            logger.error(f"目标文件已存在: {target}")
-            return False
-        
         # 确保目标目录存在
         ensure_output_dir(target)
         
-        # 移动文件
-        shutil.move(str(source), str(target))
+        if overwrite:
+            shutil.move(str(source), str(target))
+        elif stat.S_ISREG(source_stat.st_mode):
+            # 普通文件：原子地移动且不覆盖已有文件
+            if not _move_no_clobber(source, target):
+                logger.error(f"目标文件已存在: {target}")
+                return False
+        else:
+            # 目录、符号链接等保持原有的检查后移动
+            if target.exists():
+                logger.error(f"目标文件已存在: {target}")
+                return False
+            shutil.move(str(source), str(target))
+        
         logger.info(f"文件移动完成: {source} -> {target}")
         return True
         
@@ -179,27 +295,39 @@ def copy_file(source_path: Union[str, Path],
     Returns:
         bool: 是否成功
     """
+    source = Path(source_path)
+    target = Path(target_path)
+    reserved = False
     try:
-        source = Path(source_path)
-        target = Path(target_path)
-        
-        if not source.exists():
+        # 直接lstat源路径，不存在时立即失败，无需单独的exists()检查
+        try:
+            source_stat = os.lstat(source)
+        except FileNotFoundError:
             logger.error(f"源文件不存在: {source}")
             return False
         
-        if target.exists() and not overwrite:
-            logger.error(f"目标文件已存在: {target}")
-            return False
-        
         # 确保目标目录存在
         ensure_output_dir(target)
         
+        if not overwrite:
+            if stat.S_ISREG(source_stat.st_mode):
+                # 普通文件：原子地预留目标文件名，复制时覆盖占位文件
+                reserved = _reserve_target(target)
+                target_exists = not reserved
+            else:
+                target_exists = target.exists()
+            if target_exists:
+                logger.error(f"目标文件已存在: {target}")
+                return False
+        
         # 复制文件
         shutil.copy2(str(source), str(target))
         logger.info(f"文件复制完成: {source} -> {target}")
         return True
         
     except Exception as e:
+        if reserved:
+            _release_target(target)
         logger.error(f"复制文件失败: {e}")
         return False
 
@@ -256,17 +384,25 @@ def create_directory_structure(base_dir: Union[str, Path],
     try:
         base_path = Path(base_dir)
         
-        def create_dirs(current_path: Path, struct: dict):
+        # 先展开为路径列表，只需对叶子目录调用 mkdir（parents=True 会创建中间目录）
+        dir_count = 0
+        leaf_paths = []
+        
+        def flatten(current_path: Path, struct: dict):
+            nonlocal dir_count
             for name, subdirs in struct.items():
                 dir_path = current_path / name
-                dir_path.mkdir(parents=True, exist_ok=True)
-                logger.debug(f"创建目录: {dir_path}")
-                
-                if isinstance(subdirs, dict):
-                    create_dirs(dir_path, subdirs)
+                dir_count += 1
+                if isinstance(subdirs, dict) and subdirs:
+                    flatten(dir_path, subdirs)
+                else:
+                    leaf_paths.append(dir_path)
+        
+        flatten(base_path, structure)
+        for dir_path in leaf_paths:
+            dir_path.mkdir(parents=True, exist_ok=True)
         
-        create_dirs(base_path, structure)
-        logger.info(f"目录结构创建完成: {base_path}")
+        logger.info(f"目录结构创建完成: {base_path}（共 {dir_count} 个目录）")
         return True
         
     except Exception as e:
@@ -283,13 +419,8 @@ def clean_filename(filename: str) -> str:
     Returns:
         str: 清理后的文件名
     """
-    # 定义非法字符
-    illegal_chars = '<>:"/\\|?*'
-    
-    # 替换非法字符
-    clean_name = filename
-    for char in illegal_chars:
-        clean_name = clean_name.replace(char, '_')
+    # 替换非法字符（一次遍历完成全部替换）
+    clean_name = filename.translate(_ILLEGAL_FILENAME_TABLE)
     
     # 移除多余的空格和点
     clean_name = clean_name.strip(' .')
@@ -301,20 +432,37 @@ def clean_filename(filename: str) -> str:
     return clean_name
 
 
-def get_directory_size(directory: Union[str, Path]) -> int:
+def get_directory_size(directory: Union[str, Path], cap: Optional[int] = None) -> int:
     """获取目录大小（字节）
     
     Args:
         directory: 目录路径
+        cap: 大小上限（字节），累计大小超过上限时立即停止遍历
         
     Returns:
-        int: 目录大小（字节）
+        int: 目录大小（字节）；指定 cap 且提前停止时返回已统计的大小（大于 cap）
     """
     try:
         total_size = 0
-        for file_path in Path(directory).rglob('*'):
-            if file_path.is_file():
-                total_size += file_path.stat().st_size
+        # 用显式栈遍历目录树，直接使用 DirEntry，不构造 Path 对象
+        stack = [os.fspath(directory)]
+        while stack:
+            current = stack.pop()
+            # 无法读取的子目录（无权限、遍历中被删除等）直接跳过，不影响其余目录的统计
+            try:
+                entries = os.scandir(current)
+            except OSError as e:
+                logger.debug(f"无法读取目录: {current}, 错误: {e}")
+                continue
+            
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        total_size += entry.stat().st_size
+                        if cap is not None and total_size > cap:
+                            return total_size
         return total_size
     except Exception as e:
         logger.error(f"获取目录大小失败: {e}")
@@ -3,13 +3,295 @@
 """
 
 import os
+import json
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from math import gcd
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from functools import lru_cache
 from pathlib import Path
-from typing import Union, Dict, Any, Optional
+from typing import Union, Dict, Any, Optional, List
 import logging
-from moviepy import VideoFileClip, AudioFileClip
+
+from config import SUPPORTED_FORMATS
 
 logger = logging.getLogger(__name__)
 
+# MoviePy 会连带导入 numpy/PIL/imageio，只在确实需要打开媒体文件时才导入
+_VideoFileClip = None
+_AudioFileClip = None
+
+
+def _get_video_file_clip():
+    """首次调用时导入并缓存 moviepy.VideoFileClip"""
+    global _VideoFileClip
+    if _VideoFileClip is None:
+        from moviepy import VideoFileClip
+        _VideoFileClip = VideoFileClip
+    return _VideoFileClip
+
+
+def _get_audio_file_clip():
+    """首次调用时导入并缓存 moviepy.AudioFileClip"""
+    global _AudioFileClip
+    if _AudioFileClip is None:
+        from moviepy import AudioFileClip
+        _AudioFileClip = AudioFileClip
+    return _AudioFileClip
+
+
+# 可识别的媒体扩展名
+_VIDEO_EXTS = frozenset(SUPPORTED_FORMATS["video"])
+_AUDIO_EXTS = frozenset(SUPPORTED_FORMATS["audio"])
+
+# 文件大小单位
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+# 分辨率类别阈值（按像素总数从高到低）
+_RES_THRESHOLDS = (
+    (7680 * 4320, "8K"),
+    (3840 * 2160, "4K"),
+    (2560 * 1440, "2K"),
+    (1920 * 1080, "Full HD"),
+    (1280 * 720, "HD"),
+    (854 * 480, "SD"),
+)
+
+# 常见宽高比映射
+_RATIO_NAMES = {
+    (16, 9): "16:9 (宽屏)",
+    (4, 3): "4:3 (标准)",
+    (21, 9): "21:9 (超宽屏)",
+    (1, 1): "1:1 (正方形)",
+    (3, 2): "3:2",
+    (5, 4): "5:4",
+    (16, 10): "16:10",
+}
+
+# 扩展名对应的常见编解码器
+_CODEC_MAPPING = {
+    '.mp4': {'video': 'H.264', 'audio': 'AAC'},
+    '.avi': {'video': 'H.264/DivX', 'audio': 'MP3/PCM'},
+    '.mkv': {'video': 'H.264/H.265', 'audio': 'AAC/FLAC'},
+    '.mov': {'video': 'H.264', 'audio': 'AAC'},
+    '.webm': {'video': 'VP8/VP9', 'audio': 'Vorbis/Opus'},
+    '.flv': {'video': 'H.264', 'audio': 'AAC/MP3'},
+    '.mp3': {'audio': 'MP3'},
+    '.wav': {'audio': 'PCM'},
+    '.flac': {'audio': 'FLAC'},
+    '.aac': {'audio': 'AAC'},
+    '.ogg': {'audio': 'Vorbis'},
+}
+_UNKNOWN_CODEC = {'video': '未知', 'audio': '未知'}
+
+# 兼容的格式转换（值为 frozenset，成员判断为O(1)）
+_COMPATIBLE_CONVERSIONS = {
+    # 视频格式之间的转换
+    '.mp4': frozenset({'.avi', '.mkv', '.mov', '.webm', '.flv'}),
+    '.avi': frozenset({'.mp4', '.mkv', '.mov', '.webm'}),
+    '.mkv': frozenset({'.mp4', '.avi', '.mov', '.webm'}),
+    '.mov': frozenset({'.mp4', '.avi', '.mkv', '.webm'}),
+    '.webm': frozenset({'.mp4', '.avi', '.mkv', '.mov'}),
+    '.flv': frozenset({'.mp4', '.avi', '.mkv'}),
+    
+    # 音频格式之间的转换
+    '.mp3': frozenset({'.wav', '.flac', '.aac', '.ogg'}),
+    '.wav': frozenset({'.mp3', '.flac', '.aac', '.ogg'}),
+    '.flac': frozenset({'.mp3', '.wav', '.aac', '.ogg'}),
+    '.aac': frozenset({'.mp3', '.wav', '.flac', '.ogg'}),
+    '.ogg': frozenset({'.mp3', '.wav', '.flac', '.aac'}),
+}
+_EMPTY_EXTS = frozenset()
+
+
+@lru_cache(maxsize=None)
+def _find_ffprobe() -> Optional[str]:
+    """查找ffprobe可执行文件（只查找一次）"""
+    return shutil.which('ffprobe')
+
+
+def probe_media(file_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """使用ffprobe获取媒体文件的流和容器信息
+    
+    只读取容器元数据，不启动解码流程。
+    
+    Args:
+        file_path: 媒体文件路径
+        
+    Returns:
+        Optional[Dict]: ffprobe的JSON输出，ffprobe不可用时返回None
+    """
+    ffprobe = _find_ffprobe()
+    if ffprobe is None:
+        return None
+    
+    result = subprocess.run(
+        [ffprobe, '-v', 'error', '-print_format', 'json',
+         '-show_format', '-show_streams', str(file_path)],
+        capture_output=True, timeout=10, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def _find_stream(probe: Dict[str, Any], codec_type: str) -> Optional[Dict[str, Any]]:
+    """从ffprobe结果中查找第一个指定类型的流"""
+    for stream in probe.get('streams', []):
+        if stream.get('codec_type') == codec_type:
+            return stream
+    return None
+
+
+def _probe_duration(probe: Dict[str, Any], stream: Dict[str, Any]) -> float:
+    """读取流时长，流中没有时使用容器时长"""
+    duration = stream.get('duration') or probe.get('format', {}).get('duration')
+    return float(duration) if duration else 0.0
+
+
+def _parse_frame_rate(rate: Optional[str]) -> Optional[float]:
+    """解析ffprobe的帧率字符串（如 "30000/1001"）"""
+    try:
+        return float(Fraction(rate))
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def _video_info_from_probe(probe: Dict[str, Any]) -> Dict[str, Any]:
+    """将ffprobe结果映射为视频信息字段"""
+    video = _find_stream(probe, 'video')
+    if video is None:
+        raise ValueError("未找到视频流")
+    audio = _find_stream(probe, 'audio')
+    
+    duration = _probe_duration(probe, video)
+    width = int(video['width'])
+    height = int(video['height'])
+    
+    info = {
+        "duration": duration,
+        "duration_formatted": format_duration(duration),
+        "fps": _parse_frame_rate(video.get('r_frame_rate')),
+        "size": [width, height],
+        "width": width,
+        "height": height,
+        "aspect_ratio": f"{width}:{height}",
+        "has_audio": audio is not None,
+    }
+    
+    if audio is not None:
+        info.update({
+            "audio_fps": int(audio['sample_rate']) if audio.get('sample_rate') else None,
+            "audio_duration": _probe_duration(probe, audio),
+            "audio_channels": audio.get('channels'),
+        })
+    
+    return info
+
+
+def _video_info_from_clip(file_path: Union[str, Path]) -> Dict[str, Any]:
+    """通过MoviePy打开视频获取信息（ffprobe不可用时的回退路径）"""
+    clip = _get_video_file_clip()(str(file_path))
+    
+    info = {
+        "duration": clip.duration,
+        "duration_formatted": format_duration(clip.duration),
+        "fps": clip.fps,
+        "size": clip.size,
+        "width": clip.w,
+        "height": clip.h,
+        "aspect_ratio": f"{clip.w}:{clip.h}",
+        "has_audio": clip.audio is not None,
+    }
+    
+    # 如果有音频，获取音频信息
+    if clip.audio is not None:
+        info.update({
+            "audio_fps": clip.audio.fps,
+            "audio_duration": clip.audio.duration,
+            "audio_channels": clip.audio.nchannels if hasattr(clip.audio, 'nchannels') else None,
+        })
+    
+    clip.close()
+    return info
+
+
+def _audio_info_from_probe(probe: Dict[str, Any]) -> Dict[str, Any]:
+    """将ffprobe结果映射为音频信息字段"""
+    audio = _find_stream(probe, 'audio')
+    if audio is None:
+        raise ValueError("未找到音频流")
+    
+    duration = _probe_duration(probe, audio)
+    return {
+        "duration": duration,
+        "duration_formatted": format_duration(duration),
+        "fps": int(audio['sample_rate']) if audio.get('sample_rate') else None,
+        "channels": audio.get('channels'),
+    }
+
+
+def _audio_info_from_clip(file_path: Union[str, Path]) -> Dict[str, Any]:
+    """通过MoviePy打开音频获取信息（ffprobe不可用时的回退路径）"""
+    clip = _get_audio_file_clip()(str(file_path))
+    
+    info = {
+        "duration": clip.duration,
+        "duration_formatted": format_duration(clip.duration),
+        "fps": clip.fps,
+        "channels": clip.nchannels if hasattr(clip, 'nchannels') else None,
+    }
+    
+    clip.close()
+    return info
+
+
+# 媒体信息的进程内LRU缓存，键为 (类型, 路径, 修改时间, 大小)，文件改动后自动失效
+_INFO_CACHE_SIZE = 512
+_info_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_info_cache_lock = threading.Lock()
+
+
+def _cached_media_info(kind: str, file_path: Union[str, Path],
+                       stat: os.stat_result) -> Dict[str, Any]:
+    """获取媒体信息字段（视频或音频），命中缓存时不再调用ffprobe或打开剪辑
+    
+    Args:
+        kind: 'video' 或 'audio'
+        file_path: 媒体文件路径
+        stat: 文件的stat结果
+        
+    Returns:
+        Dict: 媒体信息字段
+    """
+    key = (kind, str(file_path), stat.st_mtime_ns, stat.st_size)
+    with _info_cache_lock:
+        media_info = _info_cache.get(key)
+        if media_info is not None:
+            _info_cache.move_to_end(key)
+            return dict(media_info)
+    
+    # 缓存未命中时在锁外执行耗时的探测，避免阻塞其他线程
+    probe = probe_media(file_path)
+    if kind == 'video':
+        if probe is not None:
+            media_info = _video_info_from_probe(probe)
+        else:
+            media_info = _video_info_from_clip(file_path)
+    else:
+        if probe is not None:
+            media_info = _audio_info_from_probe(probe)
+        else:
+            media_info = _audio_info_from_clip(file_path)
+    
+    with _info_cache_lock:
+        _info_cache[key] = media_info
+        _info_cache.move_to_end(key)
+        if len(_info_cache) > _INFO_CACHE_SIZE:
+            _info_cache.popitem(last=False)
+    return dict(media_info)
+
 
 def get_video_info(file_path: Union[str, Path]) -> Dict[str, Any]:
     """获取视频文件信息
@@ -20,44 +302,52 @@ def get_video_info(file_path: Union[str, Path]) -> Dict[str, Any]:
     Returns:
         Dict: 视频信息字典
     """
+    path = file_path if isinstance(file_path, Path) else Path(file_path)
+    path_str = str(path)
     try:
-        clip = VideoFileClip(str(file_path))
+        stat = path.stat()
+        media_info = _cached_media_info('video', path_str, stat)
         
         info = {
-            "file_path": str(file_path),
-            "file_name": Path(file_path).name,
-            "file_size": get_file_size_readable(file_path),
-            "file_size_bytes": Path(file_path).stat().st_size,
-            "duration": clip.duration,
-            "duration_formatted": format_duration(clip.duration),
-            "fps": clip.fps,
-            "size": clip.size,
-            "width": clip.w,
-            "height": clip.h,
-            "aspect_ratio": f"{clip.w}:{clip.h}",
-            "has_audio": clip.audio is not None,
+            "file_path": path_str,
+            "file_name": path.name,
+            "file_size": convert_size_to_readable(stat.st_size),
+            "file_size_bytes": stat.st_size,
         }
-        
-        # 如果有音频，获取音频信息
-        if clip.audio is not None:
-            info.update({
-                "audio_fps": clip.audio.fps,
-                "audio_duration": clip.audio.duration,
-                "audio_channels": clip.audio.nchannels if hasattr(clip.audio, 'nchannels') else None,
-            })
-        
-        clip.close()
+        info.update(media_info)
         return info
         
     except Exception as e:
         logger.error(f"获取视频信息失败: {file_path}, 错误: {e}")
         return {
-            "file_path": str(file_path),
-            "file_name": Path(file_path).name,
+            "file_path": path_str,
+            "file_name": path.name,
             "error": str(e)
         }
 
 
+def get_video_info_batch(file_paths: List[Union[str, Path]],
+                         max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """并行获取多个视频文件的信息
+    
+    每个文件的耗时主要是ffprobe子进程和I/O等待，因此使用线程池并发执行。
+    返回结果与输入顺序一致；单个文件失败时对应位置是带 error 字段的字典。
+    
+    Args:
+        file_paths: 视频文件路径列表
+        max_workers: 最大线程数（默认 min(32, 文件数)）
+        
+    Returns:
+        List[Dict]: 视频信息字典列表
+    """
+    file_paths = list(file_paths)
+    if not file_paths:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=max_workers or min(32, len(file_paths))) as executor:
+        return list(executor.map(get_video_info, file_paths))
+
+
 def get_audio_info(file_path: Union[str, Path]) -> Dict[str, Any]:
     """获取音频文件信息
     
@@ -67,28 +357,26 @@ def get_audio_info(file_path: Union[str, Path]) -> Dict[str, Any]:
     Returns:
         Dict: 音频信息字典
     """
+    path = file_path if isinstance(file_path, Path) else Path(file_path)
+    path_str = str(path)
     try:
-        clip = AudioFileClip(str(file_path))
+        stat = path.stat()
+        media_info = _cached_media_info('audio', path_str, stat)
         
         info = {
-            "file_path": str(file_path),
-            "file_name": Path(file_path).name,
-            "file_size": get_file_size_readable(file_path),
-            "file_size_bytes": Path(file_path).stat().st_size,
-            "duration": clip.duration,
-            "duration_formatted": format_duration(clip.duration),
-            "fps": clip.fps,
-            "channels": clip.nchannels if hasattr(clip, 'nchannels') else None,
+            "file_path": path_str,
+            "file_name": path.name,
+            "file_size": convert_size_to_readable(stat.st_size),
+            "file_size_bytes": stat.st_size,
         }
-        
-        clip.close()
+        info.update(media_info)
         return info
         
     except Exception as e:
         logger.error(f"获取音频信息失败: {file_path}, 错误: {e}")
         return {
-            "file_path": str(file_path),
-            "file_name": Path(file_path).name,
+            "file_path": path_str,
+            "file_name": path.name,
             "error": str(e)
         }
 
@@ -102,11 +390,15 @@ def is_valid_video_format(file_path: Union[str, Path]) -> bool:
     Returns:
         bool: 是否为有效视频格式
     """
+    if Path(file_path).suffix.lower() not in _VIDEO_EXTS:
+        return False
+    
     try:
-        clip = VideoFileClip(str(file_path))
-        is_valid = clip.duration > 0 and clip.size[0] > 0 and clip.size[1] > 0
-        clip.close()
-        return is_valid
+        # 与 get_video_info 共用媒体信息缓存，找不到视频流时会抛出异常
+        media_info = _cached_media_info('video', str(Path(file_path)), os.stat(file_path))
+        return (media_info["duration"] > 0
+                and media_info["width"] > 0
+                and media_info["height"] > 0)
     except Exception:
         return False
 
@@ -120,11 +412,13 @@ def is_valid_audio_format(file_path: Union[str, Path]) -> bool:
     Returns:
         bool: 是否为有效音频格式
     """
+    if Path(file_path).suffix.lower() not in _AUDIO_EXTS:
+        return False
+    
     try:
-        clip = AudioFileClip(str(file_path))
-        is_valid = clip.duration > 0
-        clip.close()
-        return is_valid
+        # 与 get_audio_info 共用媒体信息缓存，找不到音频流时会抛出异常
+        media_info = _cached_media_info('audio', str(Path(file_path)), os.stat(file_path))
+        return media_info["duration"] > 0
     except Exception:
         return False
 
@@ -141,18 +435,14 @@ def convert_size_to_readable(size_bytes: int) -> str:
     if size_bytes == 0:
         return "0 B"
     
-    units = ["B", "KB", "MB", "GB", "TB"]
-    unit_index = 0
-    size = float(size_bytes)
-    
-    while size >= 1024 and unit_index < len(units) - 1:
-        size /= 1024
-        unit_index += 1
+    # 每1024倍对应10个二进制位，直接由位长得到单位下标
+    unit_index = min(max((int(size_bytes).bit_length() - 1) // 10, 0), len(_SIZE_UNITS) - 1)
+    size = size_bytes / (1 << (unit_index * 10))
     
     if unit_index == 0:
-        return f"{int(size)} {units[unit_index]}"
+        return f"{int(size)} {_SIZE_UNITS[unit_index]}"
     else:
-        return f"{size:.2f} {units[unit_index]}"
+        return f"{size:.2f} {_SIZE_UNITS[unit_index]}"
 
 
 def get_file_size_readable(file_path: Union[str, Path]) -> str:
@@ -165,7 +455,7 @@ def get_file_size_readable(file_path: Union[str, Path]) -> str:
         str: 可读的文件大小
     """
     try:
-        size_bytes = Path(file_path).stat().st_size
+        size_bytes = os.stat(file_path).st_size
         return convert_size_to_readable(size_bytes)
     except Exception:
         return "未知"
@@ -207,20 +497,10 @@ def get_resolution_category(width: int, height: int) -> str:
     """
     total_pixels = width * height
     
-    if total_pixels >= 7680 * 4320:  # 8K
-        return "8K"
-    elif total_pixels >= 3840 * 2160:  # 4K
-        return "4K"
-    elif total_pixels >= 2560 * 1440:  # 2K
-        return "2K"
-    elif total_pixels >= 1920 * 1080:  # Full HD
-        return "Full HD"
-    elif total_pixels >= 1280 * 720:  # HD
-        return "HD"
-    elif total_pixels >= 854 * 480:  # SD
-        return "SD"
-    else:
-        return "Low"
+    for threshold, category in _RES_THRESHOLDS:
+        if total_pixels >= threshold:
+            return category
+    return "Low"
 
 
 def calculate_bitrate(file_size_bytes: int, duration_seconds: float) -> str:
@@ -258,28 +538,11 @@ def get_aspect_ratio_name(width: int, height: int) -> str:
     Returns:
         str: 宽高比名称
     """
-    # 计算最大公约数
-    def gcd(a, b):
-        while b:
-            a, b = b, a % b
-        return a
-    
     ratio_gcd = gcd(width, height)
     ratio_w = width // ratio_gcd
     ratio_h = height // ratio_gcd
     
-    # 常见宽高比映射
-    ratio_names = {
-        (16, 9): "16:9 (宽屏)",
-        (4, 3): "4:3 (标准)",
-        (21, 9): "21:9 (超宽屏)",
-        (1, 1): "1:1 (正方形)",
-        (3, 2): "3:2",
-        (5, 4): "5:4",
-        (16, 10): "16:10",
-    }
-    
-    return ratio_names.get((ratio_w, ratio_h), f"{ratio_w}:{ratio_h}")
+    return _RATIO_NAMES.get((ratio_w, ratio_h), f"{ratio_w}:{ratio_h}")
 
 
 def estimate_compression_ratio(original_size: int, compressed_size: int) -> str:
@@ -317,21 +580,7 @@ def get_codec_info(file_path: Union[str, Path]) -> Dict[str, str]:
     # 目前返回基本信息
     file_ext = Path(file_path).suffix.lower()
     
-    codec_mapping = {
-        '.mp4': {'video': 'H.264', 'audio': 'AAC'},
-        '.avi': {'video': 'H.264/DivX', 'audio': 'MP3/PCM'},
-        '.mkv': {'video': 'H.264/H.265', 'audio': 'AAC/FLAC'},
-        '.mov': {'video': 'H.264', 'audio': 'AAC'},
-        '.webm': {'video': 'VP8/VP9', 'audio': 'Vorbis/Opus'},
-        '.flv': {'video': 'H.264', 'audio': 'AAC/MP3'},
-        '.mp3': {'audio': 'MP3'},
-        '.wav': {'audio': 'PCM'},
-        '.flac': {'audio': 'FLAC'},
-        '.aac': {'audio': 'AAC'},
-        '.ogg': {'audio': 'Vorbis'},
-    }
-    
-    return codec_mapping.get(file_ext, {'video': '未知', 'audio': '未知'})
+    return dict(_CODEC_MAPPING.get(file_ext, _UNKNOWN_CODEC))
 
 
 def validate_output_format(input_path: Union[str, Path], 
@@ -348,27 +597,9 @@ def validate_output_format(input_path: Union[str, Path],
     input_ext = Path(input_path).suffix.lower()
     output_ext = Path(output_path).suffix.lower()
     
-    # 定义兼容的转换
-    compatible_conversions = {
-        # 视频格式之间的转换
-        '.mp4': ['.avi', '.mkv', '.mov', '.webm', '.flv'],
-        '.avi': ['.mp4', '.mkv', '.mov', '.webm'],
-        '.mkv': ['.mp4', '.avi', '.mov', '.webm'],
-        '.mov': ['.mp4', '.avi', '.mkv', '.webm'],
-        '.webm': ['.mp4', '.avi', '.mkv', '.mov'],
-        '.flv': ['.mp4', '.avi', '.mkv'],
-        
-        # 音频格式之间的转换
-        '.mp3': ['.wav', '.flac', '.aac', '.ogg'],
-        '.wav': ['.mp3', '.flac', '.aac', '.ogg'],
-        '.flac': ['.mp3', '.wav', '.aac', '.ogg'],
-        '.aac': ['.mp3', '.wav', '.flac', '.ogg'],
-        '.ogg': ['.mp3', '.wav', '.flac', '.aac'],
-    }
-    
     # 如果格式相同，总是兼容的
     if input_ext == output_ext:
         return True
     
     # 检查是否在兼容列表中
-    return output_ext in compatible_conversions.get(input_ext, []) 
\ No newline at end of file
+    return output_ext in _COMPATIBLE_CONVERSIONS.get(input_ext, _EMPTY_EXTS) 
\ No newline at end of file
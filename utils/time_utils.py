@@ -2,12 +2,36 @@
 时间处理工具函数
 """
 
+import math
 import re
-from typing import Union
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple, Union
 import logging
 
+if TYPE_CHECKING:
+    import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# 预编译的SRT时间格式正则
+_RE_SRT = re.compile(r'^(\d{1,2}):(\d{1,2}):(\d{1,2}),(\d{1,3})$')
+_RE_SRT_CUE_BYTES = re.compile(
+    rb'(\d{2}):(\d{2}):(\d{2}),(\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2}),(\d{3})'
+)
+
+
+def _add_fraction(total_seconds: int, frac: str) -> float:
+    """将小数部分的数字串（如 "5" 表示0.5秒）加到整数秒上"""
+    fraction = int(frac) if frac else 0
+    if fraction:
+        return total_seconds + fraction / (10 ** len(frac))
+    return float(total_seconds)
+
+
+def _is_clock_field(*fields: str) -> bool:
+    """检查时、分、秒字段均为1-2位数字"""
+    return all(len(field) in (1, 2) and field.isdecimal() for field in fields)
+
 
 def parse_time_string(time_str: Union[str, float, int]) -> float:
     """解析时间字符串为秒数
@@ -28,61 +52,123 @@ def parse_time_string(time_str: Union[str, float, int]) -> float:
     if not isinstance(time_str, str):
         raise ValueError(f"时间格式不支持: {type(time_str)}")
     
-    time_str = time_str.strip()
+    return _parse_time_str(time_str)
+
+
+@lru_cache(maxsize=1024)
+def _parse_time_str(time_str: str) -> float:
+    """解析时间字符串（结果按输入字符串缓存，重复解析相同的时间点时直接返回）
     
-    # 匹配 HH:MM:SS 格式
-    pattern_hms = r'^(\d{1,2}):(\d{1,2}):(\d{1,2})(?:\.(\d+))?$'
-    match = re.match(pattern_hms, time_str)
-    if match:
-        hours = int(match.group(1))
-        minutes = int(match.group(2))
-        seconds = int(match.group(3))
-        milliseconds = int(match.group(4) or 0)
-        
-        total_seconds = hours * 3600 + minutes * 60 + seconds
-        if milliseconds:
-            # 处理毫秒
-            total_seconds += milliseconds / (10 ** len(match.group(4)))
-        
-        return float(total_seconds)
-    
-    # 匹配 MM:SS 格式
-    pattern_ms = r'^(\d{1,2}):(\d{1,2})(?:\.(\d+))?$'
-    match = re.match(pattern_ms, time_str)
-    if match:
-        minutes = int(match.group(1))
-        seconds = int(match.group(2))
-        milliseconds = int(match.group(3) or 0)
-        
-        total_seconds = minutes * 60 + seconds
-        if milliseconds:
-            total_seconds += milliseconds / (10 ** len(match.group(3)))
-        
-        return float(total_seconds)
-    
-    # 匹配纯数字格式（秒）
-    pattern_s = r'^(\d+)(?:\.(\d+))?$'
-    match = re.match(pattern_s, time_str)
-    if match:
-        seconds = int(match.group(1))
-        milliseconds = int(match.group(2) or 0)
+    Args:
+        time_str: 时间字符串
         
-        total_seconds = seconds
-        if milliseconds:
-            total_seconds += milliseconds / (10 ** len(match.group(2)))
+    Returns:
+        float: 时间（秒）
+    """
+    # 绝大多数输入首尾没有空白，先检查首尾字符再决定是否调用 strip()
+    if time_str and (time_str[0].isspace() or time_str[-1].isspace()):
+        time_str = time_str.strip()
+    
+    return _parse_clean_time_str(time_str)
+
+
+def parse_time_string_nostrip(time_str: str) -> float:
+    """解析不含首尾空白的时间字符串为秒数
+    
+    供已完成分词的批量解析使用（如按 "-->" 切分后的字幕时间），跳过空白处理、
+    类型判断和结果缓存；输入含首尾空白时会被视为无效格式。
+    
+    Args:
+        time_str: 时间字符串，格式同 parse_time_string
         
-        return float(total_seconds)
+    Returns:
+        float: 时间（秒）
+    """
+    return _parse_clean_time_str(time_str)
+
+
+def _parse_clean_time_str(time_str: str) -> float:
+    """解析已去除首尾空白的时间字符串"""
+    # 快速路径：最常见的定宽 HH:MM:SS 格式直接按位置切片
+    if len(time_str) == 8 and time_str[2] == ':' and time_str[5] == ':':
+        hours_str, minutes_str, seconds_str = time_str[0:2], time_str[3:5], time_str[6:8]
+        if hours_str.isdecimal() and minutes_str.isdecimal() and seconds_str.isdecimal():
+            return float(int(hours_str) * 3600 + int(minutes_str) * 60 + int(seconds_str))
+    
+    # 冒号个数直接决定格式：0个为纯秒数，1个为 MM:SS，2个为 HH:MM:SS
+    colon_count = time_str.count(':')
+    if colon_count == 0:
+        hours_str, minutes_str, rest = '0', '0', time_str
+    elif colon_count == 1:
+        minutes_str, rest = time_str.split(':')
+        hours_str = '0'
+    elif colon_count == 2:
+        hours_str, minutes_str, rest = time_str.split(':')
+    else:
+        raise ValueError(f"无法解析时间格式: {time_str}")
+    
+    sec_str, dot, frac = rest.partition('.')
+    if (sec_str.isdecimal() and (not dot or frac.isdecimal())
+            and (colon_count == 0 or _is_clock_field(minutes_str, hours_str, sec_str))):
+        total_seconds = int(hours_str) * 3600 + int(minutes_str) * 60 + int(sec_str)
+        return _add_fraction(total_seconds, frac)
     
     raise ValueError(f"无法解析时间格式: {time_str}")
 
 
+def _split_seconds(seconds: Union[int, float]) -> Tuple[int, int]:
+    """将秒数四舍五入到毫秒，拆分为 (整秒, 毫秒)"""
+    return divmod(int(seconds * 1000 + 0.5), 1000)
+
+
+def _format_hms(seconds: Union[int, float], strict_format: bool = False) -> str:
+    """格式化为 HH:MM:SS[.mmm]，strict_format 为True时总是输出毫秒"""
+    total_seconds, milliseconds = _split_seconds(seconds)
+    total_minutes, secs = divmod(total_seconds, 60)
+    hours, minutes = divmod(total_minutes, 60)
+    
+    # %-格式化由一次C层调用完成，比多字段f-string更快
+    if strict_format or milliseconds > 0:
+        return "%02d:%02d:%02d.%03d" % (hours, minutes, secs, milliseconds)
+    return "%02d:%02d:%02d" % (hours, minutes, secs)
+
+
+def _format_ms(seconds: Union[int, float], strict_format: bool = False) -> str:
+    """格式化为 MM:SS[.mmm]（分钟数不按小时进位），strict_format 为True时总是输出毫秒"""
+    total_seconds, milliseconds = _split_seconds(seconds)
+    total_minutes, secs = divmod(total_seconds, 60)
+    
+    if strict_format or milliseconds > 0:
+        return "%02d:%02d.%03d" % (total_minutes, secs, milliseconds)
+    return "%02d:%02d" % (total_minutes, secs)
+
+
+def _format_s(seconds: Union[int, float], strict_format: bool = False) -> str:
+    """格式化为 SS[.mmm]，strict_format 为True时总是输出毫秒"""
+    total_seconds, milliseconds = _split_seconds(seconds)
+    
+    if strict_format or milliseconds > 0:
+        return "%d.%03d" % (total_seconds, milliseconds)
+    return str(total_seconds)
+
+
+# format_type 到格式化函数的映射
+_TIME_FORMATTERS = {
+    "HH:MM:SS": _format_hms,
+    "MM:SS": _format_ms,
+    "SS": _format_s,
+}
+
+
 def seconds_to_time_string(seconds: Union[int, float], 
-                          format_type: str = "HH:MM:SS") -> str:
+                          format_type: str = "HH:MM:SS",
+                          strict_format: bool = False) -> str:
     """将秒数转换为时间字符串
     
     Args:
         seconds: 秒数
         format_type: 格式类型 ("HH:MM:SS", "MM:SS", "SS")
+        strict_format: 是否总是输出毫秒字段（输出宽度固定）；默认毫秒为0时省略
         
     Returns:
         str: 时间字符串
@@ -90,32 +176,10 @@ def seconds_to_time_string(seconds: Union[int, float],
     if seconds < 0:
         raise ValueError("时间不能为负数")
     
-    total_seconds = int(seconds)
-    milliseconds = int((seconds - total_seconds) * 1000)
-    
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
-    
-    if format_type == "HH:MM:SS":
-        if milliseconds > 0:
-            return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
-        else:
-            return f"{hours:02d}:{minutes:02d}:{secs:02d}"
-    elif format_type == "MM:SS":
-        total_minutes = total_seconds // 60
-        secs = total_seconds % 60
-        if milliseconds > 0:
-            return f"{total_minutes:02d}:{secs:02d}.{milliseconds:03d}"
-        else:
-            return f"{total_minutes:02d}:{secs:02d}"
-    elif format_type == "SS":
-        if milliseconds > 0:
-            return f"{total_seconds}.{milliseconds:03d}"
-        else:
-            return str(total_seconds)
-    else:
+    formatter = _TIME_FORMATTERS.get(format_type)
+    if formatter is None:
         raise ValueError(f"不支持的格式类型: {format_type}")
+    return formatter(seconds, strict_format)
 
 
 def seconds_to_srt_time(seconds: Union[int, float]) -> str:
@@ -130,14 +194,12 @@ def seconds_to_srt_time(seconds: Union[int, float]) -> str:
     if seconds < 0:
         raise ValueError("时间不能为负数")
     
-    total_seconds = int(seconds)
-    milliseconds = int((seconds - total_seconds) * 1000)
+    total_seconds, milliseconds = _split_seconds(seconds)
     
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
+    total_minutes, secs = divmod(total_seconds, 60)
+    hours, minutes = divmod(total_minutes, 60)
     
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+    return "%02d:%02d:%02d,%03d" % (hours, minutes, secs, milliseconds)
 
 
 def srt_time_to_seconds(srt_time: str) -> float:
@@ -149,9 +211,21 @@ def srt_time_to_seconds(srt_time: str) -> float:
     Returns:
         float: 秒数
     """
+    time_str = srt_time
+    if time_str and (time_str[0].isspace() or time_str[-1].isspace()):
+        time_str = time_str.strip()
+    
+    # 快速路径：标准的定宽格式 HH:MM:SS,mmm 直接按位置切片，无需正则
+    if len(time_str) == 12 and time_str[2] == ':' and time_str[5] == ':' and time_str[8] == ',':
+        hours_str, minutes_str = time_str[0:2], time_str[3:5]
+        seconds_str, milliseconds_str = time_str[6:8], time_str[9:12]
+        if (hours_str.isdecimal() and minutes_str.isdecimal()
+                and seconds_str.isdecimal() and milliseconds_str.isdecimal()):
+            return (int(hours_str) * 3600 + int(minutes_str) * 60 + int(seconds_str)
+                    + int(milliseconds_str) / 1000.0)
+    
     # 匹配 HH:MM:SS,mmm 格式
-    pattern = r'^(\d{1,2}):(\d{1,2}):(\d{1,2}),(\d{1,3})$'
-    match = re.match(pattern, srt_time.strip())
+    match = _RE_SRT.match(time_str)
     
     if not match:
         raise ValueError(f"无效的SRT时间格式: {srt_time}")
@@ -165,13 +239,82 @@ def srt_time_to_seconds(srt_time: str) -> float:
     return total_seconds
 
 
+def srt_times_to_seconds_batch(srt_times: Iterable[str]) -> "np.ndarray":
+    """批量将SRT时间格式转换为秒数
+    
+    标准的定宽 HH:MM:SS,mmm 时间戳按字节排成 (N, 12) 的数组一次性向量化计算；
+    不符合定宽格式的条目逐个交给 srt_time_to_seconds 处理（格式无效时同样抛出 ValueError）。
+    
+    Args:
+        srt_times: SRT时间字符串序列
+        
+    Returns:
+        np.ndarray: float64 秒数数组，与输入顺序一致
+    """
+    import numpy as np
+    
+    times = [t.strip() for t in srt_times]
+    if not times:
+        return np.empty(0, dtype=np.float64)
+    
+    # 存在长度不为12或非ASCII的条目时无法按定宽解析，整体退回逐个解析
+    data = None
+    if all(len(t) == 12 for t in times):
+        try:
+            data = "".join(times).encode("ascii")
+        except UnicodeEncodeError:
+            pass
+    if data is None:
+        return np.array([srt_time_to_seconds(t) for t in times], dtype=np.float64)
+    
+    chars = np.frombuffer(data, dtype=np.uint8).reshape(len(times), 12)
+    digits = chars[:, [0, 1, 3, 4, 6, 7, 9, 10, 11]].astype(np.int64) - ord("0")
+    
+    # 分隔符位置和数字位置都合法的行才使用向量化结果
+    valid = ((chars[:, 2] == ord(":")) & (chars[:, 5] == ord(":")) & (chars[:, 8] == ord(","))
+             & ((digits >= 0) & (digits <= 9)).all(axis=1))
+    
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 2] * 10 + digits[:, 3]
+    seconds = digits[:, 4] * 10 + digits[:, 5]
+    milliseconds = digits[:, 6] * 100 + digits[:, 7] * 10 + digits[:, 8]
+    result = (hours * 3600 + minutes * 60 + seconds) + milliseconds / 1000.0
+    
+    for index in np.flatnonzero(~valid):
+        result[index] = srt_time_to_seconds(times[index])
+    
+    return result
+
+
+def parse_srt_timestamps_from_bytes(data: bytes) -> List[Tuple[float, float]]:
+    """从SRT文件的原始字节中提取所有字幕的起止时间
+    
+    对整个文件做一次正则扫描，不需要先解码为字符串再逐行调用 srt_time_to_seconds。
+    
+    Args:
+        data: SRT文件内容（字节）
+        
+    Returns:
+        List[Tuple[float, float]]: 按出现顺序排列的 (开始秒数, 结束秒数) 列表
+    """
+    timestamps = []
+    for match in _RE_SRT_CUE_BYTES.finditer(data):
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = match.groups()
+        start = int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1) / 1000.0
+        end = int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2) / 1000.0
+        timestamps.append((start, end))
+    return timestamps
+
+
 def format_duration(seconds: Union[int, float], 
-                   show_milliseconds: bool = False) -> str:
+                   show_milliseconds: bool = False,
+                   strict_format: bool = False) -> str:
     """格式化持续时间为易读格式
     
     Args:
         seconds: 秒数
         show_milliseconds: 是否显示毫秒
+        strict_format: 显示毫秒时，毫秒为0也输出（如 "5.000秒"）
         
     Returns:
         str: 格式化的时间字符串
@@ -179,12 +322,10 @@ def format_duration(seconds: Union[int, float],
     if seconds < 0:
         return "0秒"
     
-    total_seconds = int(seconds)
-    milliseconds = int((seconds - total_seconds) * 1000)
+    total_seconds, milliseconds = _split_seconds(seconds)
     
-    hours = total_seconds // 3600
-    minutes = (total_seconds % 3600) // 60
-    secs = total_seconds % 60
+    total_minutes, secs = divmod(total_seconds, 60)
+    hours, minutes = divmod(total_minutes, 60)
     
     parts = []
     
@@ -193,7 +334,7 @@ def format_duration(seconds: Union[int, float],
     if minutes > 0:
         parts.append(f"{minutes}分钟")
     if secs > 0 or (hours == 0 and minutes == 0):
-        if show_milliseconds and milliseconds > 0:
+        if show_milliseconds and (strict_format or milliseconds > 0):
             parts.append(f"{secs}.{milliseconds:03d}秒")
         else:
             parts.append(f"{secs}秒")
@@ -212,15 +353,17 @@ def calculate_time_offset(start_time: Union[str, float],
     Returns:
         float: 偏移量（秒）
     """
-    start_seconds = parse_time_string(start_time)
-    target_seconds = parse_time_string(target_time)
+    start_seconds = (float(start_time) if isinstance(start_time, (int, float))
+                     else parse_time_string(start_time))
+    target_seconds = (float(target_time) if isinstance(target_time, (int, float))
+                      else parse_time_string(target_time))
     
     return target_seconds - start_seconds
 
 
 def validate_time_range(start_time: Union[str, float], 
                        end_time: Union[str, float],
-                       duration: Union[str, float] = None) -> bool:
+                       duration: Optional[Union[str, float]] = None) -> bool:
     """验证时间范围是否有效
     
     Args:
@@ -232,8 +375,10 @@ def validate_time_range(start_time: Union[str, float],
         bool: 是否有效
     """
     try:
-        start_seconds = parse_time_string(start_time)
-        end_seconds = parse_time_string(end_time)
+        start_seconds = (float(start_time) if isinstance(start_time, (int, float))
+                         else parse_time_string(start_time))
+        end_seconds = (float(end_time) if isinstance(end_time, (int, float))
+                       else parse_time_string(end_time))
         
         # 检查开始时间是否小于结束时间
         if start_seconds >= end_seconds:
@@ -247,7 +392,8 @@ def validate_time_range(start_time: Union[str, float],
         
         # 如果提供了总时长，检查结束时间是否超过总时长
         if duration is not None:
-            duration_seconds = parse_time_string(duration)
+            duration_seconds = (float(duration) if isinstance(duration, (int, float))
+                                else parse_time_string(duration))
             if end_seconds > duration_seconds:
                 logger.error(f"结束时间 ({end_seconds}) 超过了总时长 ({duration_seconds})")
                 return False
@@ -259,8 +405,12 @@ def validate_time_range(start_time: Union[str, float],
         return False
 
 
+# 计算分段数时允许的相对误差（以分段时长为单位）
+_CHUNK_COUNT_TOLERANCE = 1e-9
+
+
 def split_time_into_chunks(total_duration: Union[str, float], 
-                          chunk_duration: Union[str, float]) -> list:
+                          chunk_duration: Union[str, float]) -> List[Tuple[float, float]]:
     """将总时长分割为多个时间段
     
     Args:
@@ -268,23 +418,31 @@ def split_time_into_chunks(total_duration: Union[str, float],
         chunk_duration: 每段时长
         
     Returns:
-        list: 时间段列表，每个元素是 (start_time, end_time) 元组
+        List[Tuple[float, float]]: 时间段列表，每个元素是 (start_time, end_time) 元组
     """
-    total_seconds = parse_time_string(total_duration)
-    chunk_seconds = parse_time_string(chunk_duration)
+    total_seconds = (float(total_duration) if isinstance(total_duration, (int, float))
+                     else parse_time_string(total_duration))
+    chunk_seconds = (float(chunk_duration) if isinstance(chunk_duration, (int, float))
+                     else parse_time_string(chunk_duration))
     
     if chunk_seconds <= 0:
         raise ValueError("分段时长必须大于0")
     
-    chunks = []
-    current_start = 0
+    if total_seconds <= 0:
+        return []
+    
+    # 分段数带相对容差取整：总时长与整数倍分段时长只差浮点误差时（如 7.7 / 0.7），
+    # 不再多出一个近乎为零的末尾分段
+    chunk_count = max(1, math.ceil(total_seconds / chunk_seconds - _CHUNK_COUNT_TOLERANCE))
+    
+    import numpy as np
     
-    while current_start < total_seconds:
-        current_end = min(current_start + chunk_seconds, total_seconds)
-        chunks.append((current_start, current_end))
-        current_start = current_end
+    # 一次性计算所有分段边界：相邻分段共用同一个边界值，首尾严格为0和总时长
+    boundaries = np.arange(chunk_count + 1, dtype=np.float64) * chunk_seconds
+    np.minimum(boundaries, total_seconds, out=boundaries)
+    boundaries[-1] = total_seconds
     
-    return chunks
+    return list(zip(boundaries[:-1].tolist(), boundaries[1:].tolist()))
 
 
 def get_time_progress_percentage(current_time: Union[str, float], 
@@ -298,8 +456,10 @@ def get_time_progress_percentage(current_time: Union[str, float],
     Returns:
         float: 进度百分比 (0-100)
     """
-    current_seconds = parse_time_string(current_time)
-    total_seconds = parse_time_string(total_time)
+    current_seconds = (float(current_time) if isinstance(current_time, (int, float))
+                       else parse_time_string(current_time))
+    total_seconds = (float(total_time) if isinstance(total_time, (int, float))
+                     else parse_time_string(total_time))
     
     if total_seconds <= 0:
         return 0.0